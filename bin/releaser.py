@@ -3,20 +3,49 @@
 """
 This is the script to pull JDK sources, run a benchmark and combine this to produce the extended metadata files.
 
-It has no dependencies, only requiring Python 3.6+ to be installed.
+It has no dependencies, only requiring Python 3.10+ to be installed.
 """
 
+import atexit
+import concurrent.futures
+import email.utils
+import fnmatch
+import functools
+import glob
+import hashlib
 import json
 import os
+import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
+import zipfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Union, Tuple
-from urllib import request
+from typing import Any, Dict, List, Tuple
+from urllib import error, request
+
+try:
+    # optional: reuse pooled HTTPS connections instead of a TCP+TLS handshake per call
+    import requests
+    from requests.adapters import HTTPAdapter, Retry
+
+    SESSION = requests.Session()
+    SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                                          max_retries=Retry(total=3, backoff_factor=0.3)))
+    if os.getenv("GITHUB_TOKEN"):
+        SESSION.headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+except ImportError:
+    SESSION = None
+
+try:
+    # optional: native JSON parsing for the large GitHub tag responses
+    import orjson
+except ImportError:
+    orjson = None
 
 HELP = """
 Usage:
@@ -64,26 +93,101 @@ def log(msg: str):
         print(msg)
 
 
-def execute(args: Union[List[str], str]):
-    subprocess.check_call(args, cwd=CURRENT_DIR, shell=isinstance(args, str), stdout=subprocess.DEVNULL)
+def execute(args: List[str]):
+    subprocess.check_call(args, cwd=CURRENT_DIR, stdout=subprocess.DEVNULL)
 
 
-def download_file(url, path: str, retention: int = CACHE_TIME) -> str:
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
+CACHE_LOCK = threading.Lock()
+""" Guards cache directory creation and symlink replacement when downloading in parallel """
 
-    cache_path = f"{CACHE_DIR}/{path}" if ".cache" not in path else path
 
-    if not os.path.exists(cache_path) or os.path.getmtime(cache_path) + retention <= time.time():
-        log(f"Downloading {url} to {cache_path}")
-        request.urlretrieve(url, cache_path)
+def download_file(url, path: str, retention: int = CACHE_TIME) -> str:
+    cache_path = f"{CACHE_DIR}/{path}" if ".cache" not in path else path
+    etag_path = f"{cache_path}.etag"
+
+    try:
+        stat = os.stat(cache_path)
+    except FileNotFoundError:
+        stat = None
+    if stat and stat.st_mtime + retention > time.time():
+        return cache_path
+
+    # ask the server whether the cached file is still current instead of re-downloading;
+    # a 304 answer costs no bandwidth and does not count against the GitHub rate limit
+    headers = {}
+    if os.getenv("GITHUB_TOKEN") and url.startswith("https://api.github.com"):
+        headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+    if stat:
+        headers["If-Modified-Since"] = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if os.path.exists(etag_path):
+            headers["If-None-Match"] = Path(etag_path).read_text()
+
+    log(f"Downloading {url} to {cache_path}")
+    # stream with a large buffer into a .part file first, so that an aborted
+    # download never leaves a half-written file behind that the age check would accept
+    part_path = f"{cache_path}.part"
+    etag = None
+    if SESSION:
+        with SESSION.get(url, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                os.utime(cache_path)
+                return cache_path
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            # decompress while copying: the GitHub API gzips its responses and the
+            # cache has to hold the decoded bytes, not the wire bytes
+            response.raw.decode_content = True
+            with open(part_path, "wb") as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+    else:
+        try:
+            with request.urlopen(request.Request(url, headers=headers)) as response, open(part_path, "wb") as f:
+                etag = response.headers.get("ETag")
+                shutil.copyfileobj(response, f, length=1 << 20)
+        except error.HTTPError as e:
+            if e.code == 304:
+                os.utime(cache_path)
+                return cache_path
+            raise
+    os.replace(part_path, cache_path)
+    if etag:
+        Path(etag_path).write_text(etag)
     return cache_path
 
 
+@functools.lru_cache(maxsize=256)
+def _load_cached_json(path: str, mtime: float) -> Any:
+    # keyed by (path, mtime), so a re-downloaded file is re-parsed
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
 def download_json(url, path: str) -> Any:
     """ Download the JSON file from the given URL and save it to the given path, return the JSON object """
-    with open(download_file(url, path)) as f:
-        return json.load(f)
+    cache_path = download_file(url, path)
+    return _load_cached_json(cache_path, os.path.getmtime(cache_path))
+
+
+def extract_zip(path: str, dir_path: str, patterns: List[str]):
+    """ Extract the members matching one of the glob patterns in-process, spread over multiple threads """
+    with zipfile.ZipFile(path) as zf:
+        members = [name for name in zf.namelist()
+                   if not name.endswith("/") and any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+    def extract(chunk: List[str]):
+        # every worker uses its own handle, ZipFile objects are not thread-safe
+        with zipfile.ZipFile(path) as z:
+            for member in chunk:
+                target = f"{dir_path}/{member}"
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with z.open(member) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, length=32768)
+
+    workers = min(os.cpu_count(), len(members)) or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(extract, (members[i::workers] for i in range(workers))):
+            pass
 
 
 def download_zip(url, path: str, retention: int = CACHE_TIME) -> str:
@@ -92,24 +196,56 @@ def download_zip(url, path: str, retention: int = CACHE_TIME) -> str:
     path = download_file(url, path, retention=retention * 100)
     dir_path = path[:-4]
     if not os.path.exists(dir_path):
-        execute(
-            ["unzip", "-o", path, "-d", dir_path, "*/src/jdk.jfr/*", "*/src/hotspot/share/jfr/metadata/metadata.xml"])
+        extract_zip(path, dir_path, ["*/src/jdk.jfr/*", "*/src/hotspot/share/jfr/metadata/metadata.xml"])
     return dir_path
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Repo:
     version: int
     name: str
 
 
+TAGS_CACHE: Dict[str, List[Dict[str, Any]]] = {}
+""" Tags per repo name, pre-populated in one batch via GraphQL when a GITHUB_TOKEN is available """
+
+
+def fetch_all_repo_tags_graphql(repo_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """ Fetch the latest tags for all repos in a single GraphQL query (one rate-limit point instead of N) """
+    fields = "\n".join(f'r{i}: repository(owner: "openjdk", name: "{name}") {{ '
+                       f'refs(refPrefix: "refs/tags/", first: 100, '
+                       f'orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}) {{ nodes {{ name }} }} }}'
+                       for i, name in enumerate(repo_names))
+    payload = json.dumps({"query": f"query {{ {fields} }}"}).encode("utf-8")
+    headers = {"Authorization": f"Bearer {os.environ['GITHUB_TOKEN']}"}
+    if SESSION:
+        response = SESSION.post("https://api.github.com/graphql", data=payload, headers=headers)
+        response.raise_for_status()
+        result = response.json()
+    else:
+        with request.urlopen(request.Request("https://api.github.com/graphql", data=payload,
+                                             headers=headers)) as response:
+            result = json.load(response)
+    if "errors" in result or "data" not in result:
+        raise RuntimeError(f"GraphQL tag query failed: {result.get('errors', result)}")
+    data = result["data"]
+    # a repo missing from the answer (null node) simply falls back to the per-repo REST fetch
+    return {name: [{"name": node["name"],
+                    "zipball_url": f"https://api.github.com/repos/openjdk/{name}/zipball/refs/tags/{node['name']}"}
+                   for node in data[f"r{i}"]["refs"]["nodes"]]
+            for i, name in enumerate(repo_names) if data.get(f"r{i}")}
+
+
+@functools.lru_cache(maxsize=None)
 def get_repos() -> List[Repo]:
     """ Get all async-profiler versions """
-    json = []
-    for i in range(2):
-        json += download_json(f"https://api.github.com/orgs/openjdk/repos?per_page=100&page={i + 1}", f"repos{i}.json")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        pages = pool.map(
+            lambda i: download_json(f"https://api.github.com/orgs/openjdk/repos?per_page=100&page={i + 1}",
+                                    f"repos{i}.json"), range(2))
+    raw = [repo for page in pages for repo in page]
     repos = []
-    for repo in json:
+    for repo in raw:
         name = repo["name"]
         if name.startswith("jdk") and name.endswith("u"):
             version = int(name[3:][:-1])
@@ -117,20 +253,41 @@ def get_repos() -> List[Repo]:
                 repos.append(Repo(version, name))
     max_version = max(repos, key=lambda r: r.version).version
     repos.append(Repo(max_version + 1, "jdk"))
-    return sorted(repos, key=lambda r: r.version)
+    repos = sorted(repos, key=lambda r: r.version)
+    if os.getenv("GITHUB_TOKEN") and not TAGS_CACHE:
+        try:
+            TAGS_CACHE.update(fetch_all_repo_tags_graphql([repo.name for repo in repos]))
+        except Exception as e:
+            # a bad token or a GraphQL hiccup must not break every command, REST still works
+            log(f"GraphQL tag query failed, falling back to REST: {e}")
+            prefetch_tags(repos)
+    else:
+        prefetch_tags(repos)
+    return repos
+
+
+def prefetch_tags(repos: List[Repo]):
+    """ Warm the tag cache for all repos concurrently instead of fetching lazily one by one """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(repos))) as pool:
+        for _ in pool.map(get_tags, repos):
+            pass
 
 
+@functools.lru_cache(maxsize=None)
 def get_tags(repo: Repo) -> List[Dict[str, Any]]:
-    return [d for d in download_json(f"https://api.github.com/repos/openjdk/{repo.name}/tags?per_page=100",
-                                     f"tags_{repo.name}.json") if d["name"].startswith(f"jdk-{repo.version}")]
+    tags = TAGS_CACHE.get(repo.name)
+    if tags is None:
+        tags = download_json(f"https://api.github.com/repos/openjdk/{repo.name}/tags?per_page=100",
+                             f"tags_{repo.name}.json")
+    prefix = f"jdk-{repo.version}"
+    return [d for d in tags if d["name"].startswith(prefix)]
 
 
+@functools.lru_cache(maxsize=None)
 def get_latest_release_name_and_zip_url(repo: Repo) -> Tuple[str, str]:
-    names = [d["name"] for d in get_tags(repo)]
-    latest_name = names[0]
-    if any("." in name for name in names):
-        latest_name = [name for name in names if "." in name][0]
-    return latest_name, [d["zipball_url"] for d in get_tags(repo) if d["name"] == latest_name][0]
+    tags = get_tags(repo)
+    latest = next((d for d in tags if "." in d["name"]), tags[0])
+    return latest["name"], latest["zipball_url"]
 
 
 def download_urls():
@@ -144,9 +301,10 @@ def download_latest_release(repo: Repo):
     name, url = get_latest_release_name_and_zip_url(repo)
     path = download_zip(url, f"{JDK_ZIP_DIR}/{repo.name}_{name}.zip", retention=CACHE_TIME * 10)
     result_link = f"{CACHE_DIR}/{repo.name}"
-    if os.path.exists(result_link):
-        os.unlink(result_link)
-    os.symlink(next(Path(path).glob("*")), result_link)
+    with CACHE_LOCK:
+        if os.path.exists(result_link):
+            os.unlink(result_link)
+        os.symlink(next(Path(path).glob("*")), result_link)
     return result_link
 
 
@@ -166,14 +324,17 @@ def download_repo_if_not_exists(repo: Repo):
 
 
 def download():
-    """ Download the latest release for every version """
-    for repo in get_repos():
-        download_latest_release(repo)
-    download_benchmarks()
+    """ Download the latest release for every version, in parallel as this is mostly network bound """
+    repos = get_repos()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(os.cpu_count() * 4, len(repos) + 1)) as pool:
+        futures = [pool.submit(download_latest_release, repo) for repo in repos]
+        futures.append(pool.submit(download_benchmarks))
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
 
 
 def build_parser():
-    execute("mvn clean package assembly:single")
+    execute(["mvn", "clean", "package", "assembly:single"])
 
 
 def get_parser_or_build() -> str:
@@ -185,35 +346,44 @@ def get_parser_or_build() -> str:
     return parser_jar
 
 
-GC_OPTIONS = []
+GC_OPTIONS_LOCK = threading.Lock()
+
+GC_OPTION_RE = re.compile(r"^\s*\S+\s+(Use\w*GC)\b", re.MULTILINE)
+""" Matches the flag name column of -XX:+PrintFlagsFinal lines like '     bool UseG1GC   = true' """
 
 
 def jfr_file_name(gc_options: str) -> str:
     return f"{JFR_FOLDER}/sample_{gc_options}.jfr"
 
 
-def list_gc_options() -> List[str]:
-    """ List all GC options for the current JDK """
-    global GC_OPTIONS
-    if not GC_OPTIONS:
+@functools.lru_cache(maxsize=1)
+def list_gc_options() -> Tuple[str, ...]:
+    """ List all GC options for the current JDK, persisted per JDK version across runs """
+    with GC_OPTIONS_LOCK:
+        # keyed by the JDK version so a JDK upgrade invalidates the cache automatically
+        cache_file = Path(f"{CACHE_DIR}/gc_options_{java_version()}.json")
+        if cache_file.exists():
+            return tuple(json.loads(cache_file.read_text()))
         result = subprocess.check_output(["java", "-XX:+PrintFlagsFinal", "-version"],
                                          stderr=subprocess.STDOUT).decode("utf-8")
-        GC_OPTIONS = [line.strip().split(" ")[1] for line in result.splitlines() if
-                      " Use" in line and "GC " in line and "Adaptive" not in line and "Maximum" not in line]
-    return GC_OPTIONS
+        options = tuple(m.group(1) for m in GC_OPTION_RE.finditer(result)
+                        if "Adaptive" not in m.group(1) and "Maximum" not in m.group(1))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        cache_file.write_text(json.dumps(list(options)))
+        return options
 
 
 def create_jfc():
     """ Create a JFC file for the current JDK """
-    with open(os.getenv("JAVA_HOME") + "/lib/jfr/profile.jfc") as f:
-        lines = []
-        for line in f.readlines():
-            if 'name="enabled"' in line:
-                lines.append(line.replace(">false<", ">true<"))
-            else:
-                lines.append(line)
-        with open(JFC_FILE, "w") as f2:
-            f2.write("\n".join(lines))
+    with open(os.getenv("JAVA_HOME") + "/lib/jfr/profile.jfc") as f, open(JFC_FILE, "w") as f2:
+        for line in f:
+            f2.write(line.replace(">false<", ">true<") if 'name="enabled"' in line else line)
+
+
+def run_benchmarks(gc_option: str):
+    print(f"Creating JFR file for GC option {gc_option}")
+    execute(["java", f"-XX:StartFlightRecording=filename={jfr_file_name(gc_option)},settings={JFC_FILE}",
+             "-XX:+" + gc_option, "-jar", RENAISSANCE_JAR, "-t", "5", "-r", "1", "all"])
 
 
 def create_jfr(gc_option: str = None):
@@ -221,14 +391,16 @@ def create_jfr(gc_option: str = None):
     if not os.path.exists(RENAISSANCE_JAR):
         download_benchmarks()
     if gc_option:
-        print(f"Creating JFR file for GC option {gc_option}")
-        execute(["java", f"-XX:StartFlightRecording=filename={jfr_file_name(gc_option)},settings={JFC_FILE}",
-                 "-XX:+" + gc_option, "-jar", RENAISSANCE_JAR, "-t", "5", "-r", "1", "all"])
+        run_benchmarks(gc_option)
     else:
-        print(f"Creating JFR file for GC options: {', '.join(list_gc_options())}")
-        for gc_option in list_gc_options():
-            create_jfr(gc_option)
-    os.system(f"rm -fr '{CURRENT_DIR}/harness*'")
+        gc_options = list_gc_options()
+        print(f"Creating JFR file for GC options: {', '.join(gc_options)}")
+        # every run is a multi-threaded benchmark JVM, so keep the parallelism low to avoid thrashing
+        workers = min(len(gc_options), max(1, os.cpu_count() // 6))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(run_benchmarks, gc_options):
+                pass
+    clear_harness_and_launchers()
 
 
 def create_jfr_if_needed(gc_option: str = None):
@@ -236,93 +408,168 @@ def create_jfr_if_needed(gc_option: str = None):
         if not os.path.exists(jfr_file_name(gc_option)):
             create_jfr(gc_option)
     else:
+        # one directory scan instead of a stat per GC option
+        existing = {entry.name for entry in os.scandir(JFR_FOLDER)}
         for gc_option in list_gc_options():
-            create_jfr_if_needed(gc_option)
+            if os.path.basename(jfr_file_name(gc_option)) not in existing:
+                create_jfr(gc_option)
+
+
+class CollectorDaemon:
+    """
+    A long-lived JVM running CollectorDaemonKt, amortizing JVM startup and classloading
+    over all collector tool invocations. Commands are tab-separated lines, answered
+    with an ok or error marker line.
+    """
+
+    OK = "<<<ok>>>"
+    ERROR = "<<<error>>>"
+
+    def __init__(self):
+        self.process = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            ["java", "-cp", get_parser_or_build(), "me.bechberger.collector.CollectorDaemonKt"],
+            cwd=CURRENT_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+        self.pid = os.getpid()
+        atexit.register(self.close)
+
+    def run(self, tool: str, *args: str):
+        """ Run the given tool (events, examples, descriptions or since) with the given arguments """
+        with self.lock:
+            if self.process is None or self.pid != os.getpid():
+                self._start()
+            self.process.stdin.write("\t".join((tool,) + args) + "\n")
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                line = line.rstrip("\n")
+                if line == self.OK:
+                    return
+                if line.startswith(self.ERROR):
+                    raise RuntimeError(f"{tool} failed: {line[len(self.ERROR):].strip()}")
+                log(line)
+            raise RuntimeError(f"collector daemon exited unexpectedly while running {tool}")
+
+    def close(self):
+        if self.process is not None and self.pid == os.getpid():
+            try:
+                self.process.stdin.write("quit\n")
+                self.process.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                pass
+            self.process.wait()
+        self.process = None
 
 
-def meta_file_name(repo: Repo, wo_examples: bool = False) -> str:
-    return f"{METADATA_FOLDER}/metadata_{repo.version}{'_wo_examples' if wo_examples else ''}.xml"
-
+_DAEMONS = threading.local()
 
-def add_events(repo: Repo):
-    metadata_file = meta_file_name(repo)
-    execute(f"java -cp {get_parser_or_build()} me.bechberger.collector.EventAdderKt {metadata_file} {repo_folder(repo)}"
-            f" {metadata_file}")
 
+def daemon() -> CollectorDaemon:
+    """ One collector daemon per thread, so parallel build_version workers get their own JVM """
+    if not hasattr(_DAEMONS, "daemon"):
+        _DAEMONS.daemon = CollectorDaemon()
+    return _DAEMONS.daemon
 
-def java_version() -> str:
-    return subprocess.check_output(f"java -version 2>&1 | head -n 1 | cut -d '\"' -f 2", shell=True).decode("utf-8")
 
-
-def add_examples(repo: Repo):
-    metadata_file = meta_file_name(repo)
-    for gc_option in list_gc_options():
-        gc = gc_option[3:]
-        label = gc
-        description = f"Run of renaissance benchmark with {gc} on {java_version()}"
-        execute(f"java -cp {get_parser_or_build()} me.bechberger.collector.ExampleAdderKt {metadata_file} "
-                f"{label} \"{description}\" {jfr_file_name(gc_option)} {metadata_file}")
+def meta_file_name(repo: Repo, wo_examples: bool = False) -> str:
+    return f"{METADATA_FOLDER}/metadata_{repo.version}{'_wo_examples' if wo_examples else ''}.xml"
 
 
-def add_additional_descriptions(repo: Repo):
-    metadata_file = meta_file_name(repo)
-    execute(f"java -cp {get_parser_or_build()} me.bechberger.collector.AdditionalDescriptionAdderKt {metadata_file} "
-            f"{ADDITIONAL_METADATA} {metadata_file}")
+@functools.lru_cache(maxsize=1)
+def java_version() -> str:
+    out = subprocess.check_output(["java", "-version"], stderr=subprocess.STDOUT).decode("utf-8")
+    return out.splitlines()[0].split('"')[1]
 
 
 def build_version(repo: Repo):
+    """ Build the metadata file for the version in one fused daemon pass over a single in-memory DOM """
     create_jfr_if_needed()
     download_repo_if_not_exists(repo)
-    meta_file = meta_file_name(repo)
-    # copy metadata
-    if os.path.exists(meta_file):
-        os.remove(meta_file)
-    execute(f"cp \"{repo_folder(repo)}/src/hotspot/share/jfr/metadata/metadata.xml\" {meta_file}")
-    print(f"Add events from JDK source code for version {repo.version}")
-    add_events(repo)
-    print(f"Add additional descriptions for version {repo.version}")
-    add_additional_descriptions(repo)
-    meta_wo_examples = meta_file_name(repo, wo_examples=True)
-    if os.path.exists(meta_wo_examples):
-        os.remove(meta_wo_examples)
-    execute(f"cp {meta_file} {meta_wo_examples}")
-    print(f"Add examples from JFR files for version {repo.version}")
-    add_examples(repo)
+    print(f"Build metadata file for version {repo.version}")
+    version = java_version()
+    args = [f"{repo_folder(repo)}/src/hotspot/share/jfr/metadata/metadata.xml", repo_folder(repo),
+            ADDITIONAL_METADATA, meta_file_name(repo, wo_examples=True)]
+    for gc_option in list_gc_options():
+        args += [gc_option[3:], f"Run of renaissance benchmark with {gc_option[3:]} on {version}",
+                 jfr_file_name(gc_option)]
+    daemon().run("pipeline", *args, meta_file_name(repo))
 
 
 def build_versions():
-    for repo in get_repos():
-        build_version(repo)
+    repos = get_repos()
+    # create the shared prerequisites once in the parent: the JFR files, the parser JAR and the
+    # on-disk tag cache, so the workers neither race on them nor repeat rate-limited API calls
+    create_jfr_if_needed()
+    get_parser_or_build()
+    for repo in repos:
+        get_latest_release_name_and_zip_url(repo)
+    # threads suffice here: the heavy lifting happens in java subprocesses, which release the GIL
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(os.cpu_count(), len(repos))) as pool:
+        for _ in pool.map(build_version, repos):
+            pass
     print("Add since and until")
-    args = ' '.join(f"{repo.version} \"{meta_file_name(repo)}\" \"{meta_file_name(repo)}\"" for repo in get_repos())
-    execute(f"java -cp {get_parser_or_build()} me.bechberger.collector.SinceAdderKt {args}")
+    args = []
+    for repo in repos:
+        args += [str(repo.version), meta_file_name(repo), meta_file_name(repo)]
+    daemon().run("since", *args)
+
+
+def fast_copy(src: str, dst: str):
+    """ Hardlink instead of copying where possible, falling back to a real copy across filesystems """
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
+def build_key() -> str:
+    """ Hash over the latest release tags, to detect whether anything changed since the last build """
+    releases = {repo.version: get_latest_release_name_and_zip_url(repo)[0] for repo in get_repos()}
+    return hashlib.sha256(json.dumps(releases, sort_keys=True).encode("utf-8")).hexdigest()
 
 
 def build():
     """ Build the wrappers for the given release """
+    key = build_key()
+    key_file = Path(f"{RESOURCES_FOLDER}/.build_key")
+    if key_file.exists() and key_file.read_text() == key \
+            and os.path.exists(f"{CURRENT_DIR}/target/jfreventcollector-full.jar") \
+            and os.path.exists(f"{CURRENT_DIR}/target_loader/jfreventcollection-full.jar"):
+        print("Build is up-to-date, only refreshing the time stamp")
+        Path(RESOURCES_FOLDER + "/time").write_text(str(int(time.time())))
+        return
     if os.path.exists(RESOURCES_FOLDER):
         shutil.rmtree(RESOURCES_FOLDER)
     print("Build package")
-    execute(f"mvn clean package assembly:single")
+    execute(["mvn", "clean", "package", "assembly:single"])
     os.makedirs(RESOURCES_FOLDER, exist_ok=True)
-    for repo in get_repos():
+    repos = get_repos()
+    for repo in repos:
         if not os.path.exists(meta_file_name(repo)):
             build_version(repo)
-        shutil.copy(meta_file_name(repo), f"{RESOURCES_FOLDER}/metadata_{repo.version}.xml")
-    with open(RESOURCES_FOLDER + "/versions", "w") as f:
-        f.write("\n".join(str(repo.version) for repo in get_repos()))
-    with open(RESOURCES_FOLDER + "/specific_versions", "w") as f:
-        f.write("\n".join(f"{repo.version}: {get_latest_release_name_and_zip_url(repo)[0]}" for repo in get_repos()))
-        print("Build loader package")
-        execute(f"mvn -f pom_loader.xml package assembly:single")
-    with open(RESOURCES_FOLDER + "/time", "w") as f:
-        f.write(str(int(time.time())))
+        fast_copy(meta_file_name(repo), f"{RESOURCES_FOLDER}/metadata_{repo.version}.xml")
+    Path(RESOURCES_FOLDER + "/versions").write_text("\n".join(str(repo.version) for repo in repos))
+    Path(RESOURCES_FOLDER + "/specific_versions").write_text(
+        "\n".join(f"{repo.version}: {get_latest_release_name_and_zip_url(repo)[0]}" for repo in repos))
+    print("Build loader package")
+    execute(["mvn", "-f", "pom_loader.xml", "package", "assembly:single"])
+    Path(RESOURCES_FOLDER + "/time").write_text(str(int(time.time())))
+    key_file.write_text(key)
 
 
 def clear_harness_and_launchers():
     """ Delete all harness and launcher JARs """
-    execute(f"rm -rf '{CURRENT_DIR}/harness*'")
-    execute(f"rm -rf '{CURRENT_DIR}/launcher*'")
+    # the previous "rm -rf 'harness*'" kept the glob inside the quotes and therefore never matched
+    for path in glob.glob(f"{CURRENT_DIR}/harness*") + glob.glob(f"{CURRENT_DIR}/launcher*"):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
 
 
 def clear():
@@ -331,7 +578,12 @@ def clear():
     shutil.rmtree(JFR_FOLDER, ignore_errors=True)
     shutil.rmtree(METADATA_FOLDER, ignore_errors=True)
     shutil.rmtree(f"{CURRENT_DIR}/target", ignore_errors=True)
+    shutil.rmtree(f"{CURRENT_DIR}/target_loader", ignore_errors=True)
     shutil.rmtree(RESOURCES_FOLDER, ignore_errors=True)
+    # recreate the standard folders, download_file and friends rely on them existing
+    os.makedirs(JDK_ZIP_DIR, exist_ok=True)
+    os.makedirs(JFR_FOLDER, exist_ok=True)
+    os.makedirs(METADATA_FOLDER, exist_ok=True)
 
 
 def get_changelog() -> str:
@@ -348,20 +600,20 @@ def deploy_github():
         changelog_file = f"{d}/CHANGELOG.md"
         with open(changelog_file, "w") as of:
             of.write(changelog)
-            of.close()
 
+        # stage every asset under its release name via hardlinks; gh's "path#name" syntax
+        # only sets a display label, the uploaded asset keeps its file name
+        assets = [("target/jfreventcollector-full.jar", "jfreventcollector.jar"),
+                  ("target_loader/jfreventcollection-full.jar", "jfreventcollection.jar")]
+        for repo in get_repos():
+            assets.append((f"metadata/metadata_{repo.version}.xml", f"metadata_{repo.version}.xml"))
+            assets.append((f"metadata/metadata_{repo.version}_wo_examples.xml",
+                           f"metadata_{repo.version}_wo_examples.xml"))
         paths = []
-
-        def copy(file: str, name: str):
-            shutil.copy(f"{CURRENT_DIR}/{file}", f"{d}/{name}")
+        for file, name in assets:
+            fast_copy(f"{CURRENT_DIR}/{file}", f"{d}/{name}")
             paths.append(f"{d}/{name}")
 
-        copy("target/jfreventcollector-full.jar", "jfreventcollector.jar")
-        copy("target/jfreventcollection-full.jar", "jfreventcollection.jar")
-        for repo in get_repos():
-            copy(f"metadata/metadata_{repo.version}.xml", f"metadata_{repo.version}.xml")
-            copy(f"metadata/metadata_{repo.version}_wo_examples.xml", f"metadata_{repo.version}_wo_examples.xml")
-
         flags_str = f"-F {changelog_file} -t '{title}' --latest"
         paths_str = " ".join(f'"{p}"' for p in paths)
         cmd = f"gh release create {VERSION} {flags_str} {paths_str}"
@@ -382,9 +634,13 @@ def deploy_github():
 
 def deploy_maven(snapshot: bool = True):
     print(f"Deploy{' snapshot' if snapshot else ''}")
-    for suffix in ["", "_loader"]:
+
+    def deploy_pom(suffix: str):
         pom = f"pom{suffix}.xml"
-        cmd = f"mvn " \
+        # the loader gets its own local repository, as the shared artifact cache is not safe for
+        # concurrent Maven processes; it lives under ~/.m2 so clear() does not wipe it every release
+        isolation = f"-Dmaven.repo.local={Path.home()}/.m2/repository_loader " if suffix else ""
+        cmd = f"mvn {isolation}" \
               f"-Dproject.suffix='{'-SNAPSHOT' if snapshot else ''}' -Dproject.vversion={VERSION} -f {pom} clean deploy"
         try:
             subprocess.check_call(cmd, shell=True, cwd=CURRENT_DIR, stdout=subprocess.DEVNULL,
@@ -394,6 +650,11 @@ def deploy_maven(snapshot: bool = True):
                 f"cd {CURRENT_DIR}; {cmd}")
             raise
 
+    # the two POMs build into separate directories and do not depend on each other, so deploy them in parallel
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in pool.map(deploy_pom, ["", "_loader"]):
+            pass
+
 
 def deploy(snapshot: bool = True):
     deploy_maven(snapshot)
@@ -0,0 +1,82 @@
+package me.bechberger.collector
+
+/**
+ * Long-lived entry point that reads commands from stdin and dispatches them to the
+ * existing command line tools, so one JVM is reused instead of paying the JVM
+ * startup and classloading cost per tool invocation.
+ *
+ * Protocol: one tab-separated line per command, `<tool>\t<arg>\t...`, with the tools
+ * `events`, `examples`, `descriptions` and `since` taking the same arguments as the
+ * corresponding main functions; `quit` terminates the daemon. Every command is
+ * answered with an [OK] or [ERROR] line on stdout.
+ *
+ * The additional `pipeline` command fuses the per-version chain into a single pass
+ * over one in-memory metadata object, writing the wo_examples snapshot and the final
+ * file without the intermediate parse/serialize round trips:
+ * `pipeline <metadata.xml> <JDK source> <additional.xml> <wo examples out> (<label> <description> <JFR file>)... <out>`
+ */
+
+import java.nio.file.Paths
+import me.bechberger.collector.xml.readXmlAs
+import kotlin.io.path.writeText
+
+private fun runPipeline(args: List<String>) {
+    require(args.size >= 5 && (args.size - 5) % 3 == 0) { "invalid pipeline arguments" }
+    val metadata = Paths.get(args[0]).readXmlAs(me.bechberger.collector.xml.Metadata::class.java)
+    val meta = EventAdder(Paths.get(args[1]), metadata).process()
+    meta.addAdditionalDescription(Paths.get(args[2]).readXmlAs(me.bechberger.collector.xml.Metadata::class.java))
+    Paths.get(args[3]).writeText(meta.toString())
+    val exampleAdder = ExampleAdder(meta)
+    for (i in 4 until args.size - 1 step 3) {
+        exampleAdder.addEventsFromFile(args[i], args[i + 1], Paths.get(args[i + 2]))
+    }
+    Paths.get(args.last()).writeText(meta.toString())
+}
+
+const val OK = "<<<ok>>>"
+const val ERROR = "<<<error>>>"
+
+private val tools = mapOf(
+    "events" to "EventAdderKt",
+    "examples" to "ExampleAdderKt",
+    "descriptions" to "AdditionalDescriptionAdderKt",
+    "since" to "SinceAdderKt"
+)
+
+fun main() {
+    while (true) {
+        val line = readLine() ?: break
+        if (line.isBlank()) {
+            continue
+        }
+        val parts = line.split("\t")
+        if (parts[0] == "quit") {
+            break
+        }
+        if (parts[0] == "pipeline") {
+            try {
+                runPipeline(parts.drop(1))
+                println(OK)
+            } catch (e: Throwable) {
+                println("$ERROR $e")
+            }
+            System.out.flush()
+            continue
+        }
+        val tool = tools[parts[0]]
+        if (tool == null) {
+            println("$ERROR unknown tool ${parts[0]}")
+        } else {
+            try {
+                // the tool mains are file facades in this package, so they have to be resolved by class name
+                Class.forName("me.bechberger.collector.$tool")
+                    .getMethod("main", Array<String>::class.java)
+                    .invoke(null, parts.drop(1).toTypedArray())
+                println(OK)
+            } catch (e: Throwable) {
+                println("$ERROR $e")
+            }
+        }
+        System.out.flush()
+    }
+}